@@ -0,0 +1,84 @@
+import cv2
+import queue
+import threading
+
+# Shared webcam capture helpers used by the emotion, face mesh and hand
+# distance scripts.
+
+def configure_webcam(cap: cv2.VideoCapture) -> None:
+    """
+    Keeps at most one frame queued in the driver, so frames are never stale,
+    and requests MJPEG, which is cheaper to decode.
+
+    Args:
+        cap (cv2.VideoCapture): The opened webcam.
+    """
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+
+def capture_frames(cap: cv2.VideoCapture, frame_queue: queue.Queue, stop_event: threading.Event,
+                   process_every_n_frames: int) -> None:
+    """
+    Runs in a background thread, grabbing every webcam frame and decoding
+    every process_every_n_frames-th one into frame_queue, so capture overlaps
+    with inference in the main loop. Only the newest decoded frame is kept.
+    A None entry tells the main loop that the webcam stopped delivering frames.
+
+    Args:
+        cap (cv2.VideoCapture): The opened webcam.
+        frame_queue (queue.Queue): Size-1 queue holding the newest decoded frame.
+        stop_event (threading.Event): Set by the main loop to stop capturing.
+        process_every_n_frames (int): Only every n-th grabbed frame is decoded.
+    """
+    frame_count = 0
+    while not stop_event.is_set():
+        if not cap.grab():
+            frame = None
+        else:
+            frame_count += 1
+            if frame_count % process_every_n_frames != 0:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                frame = None
+
+        # Replace a frame the main loop has not picked up yet with the newer one.
+        try:
+            frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+        frame_queue.put(frame)
+
+        if frame is None:
+            break
+
+def start_capture_thread(cap: cv2.VideoCapture, process_every_n_frames: int) -> tuple:
+    """
+    Starts capture_frames in a daemon thread.
+
+    Args:
+        cap (cv2.VideoCapture): The opened webcam.
+        process_every_n_frames (int): Only every n-th grabbed frame is decoded.
+
+    Returns:
+        tuple: (frame_queue, stop_event, capture_thread). Read frames with
+               frame_queue.get() and pass the other two to stop_capture_thread.
+    """
+    frame_queue = queue.Queue(maxsize=1)
+    stop_event = threading.Event()
+    capture_thread = threading.Thread(target=capture_frames,
+                                      args=(cap, frame_queue, stop_event, process_every_n_frames),
+                                      daemon=True)
+    capture_thread.start()
+    return frame_queue, stop_event, capture_thread
+
+def stop_capture_thread(stop_event: threading.Event, capture_thread: threading.Thread) -> None:
+    """
+    Stops the capture thread and waits for it, so the webcam can be released safely.
+
+    Args:
+        stop_event (threading.Event): The event returned by start_capture_thread.
+        capture_thread (threading.Thread): The thread returned by start_capture_thread.
+    """
+    stop_event.set()
+    capture_thread.join()
\ No newline at end of file
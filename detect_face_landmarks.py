@@ -1,27 +1,70 @@
 import cv2
 import mediapipe as mp
+import numpy as np
+import os
+import time
 import logging
 
+from camera_utils import configure_webcam, start_capture_thread, stop_capture_thread
+from landmark_utils import landmarks_to_array
+
 # --- Setup Logging ---
 # Configure logging for better error messages and information
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Capture Settings ---
+# Face mesh inference runs slower than the camera, so only every 2nd frame is decoded and processed.
+PROCESS_EVERY_N_FRAMES = 2
+
+# --- Face Landmarker Model ---
+# MediaPipe Tasks face landmarker model bundle, downloadable from FACE_LANDMARKER_MODEL_URL.
+FACE_LANDMARKER_MODEL_PATH = "face_landmarker.task"
+FACE_LANDMARKER_MODEL_URL = "https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task"
+
+def create_face_landmarker(result_callback):
+    """
+    Creates a MediaPipe Tasks FaceLandmarker in LIVE_STREAM mode, which runs
+    asynchronously and reports results through result_callback. The GPU
+    delegate is tried first, falling back to the CPU where it is unsupported.
+
+    Args:
+        result_callback: Called as result_callback(result, output_image, timestamp_ms)
+                         for every processed frame.
+
+    Returns:
+        FaceLandmarker: The ready-to-use face landmarker.
+    """
+    BaseOptions = mp.tasks.BaseOptions
+    vision = mp.tasks.vision
+
+    for delegate in (BaseOptions.Delegate.GPU, BaseOptions.Delegate.CPU):
+        # 'num_faces=1' to detect one face; the confidence thresholds ensure robust detection
+        options = vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=FACE_LANDMARKER_MODEL_PATH, delegate=delegate),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_faces=1,
+            min_face_detection_confidence=0.5,
+            min_face_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+            result_callback=result_callback
+        )
+        try:
+            return vision.FaceLandmarker.create_from_options(options)
+        except Exception as e:
+            if delegate == BaseOptions.Delegate.CPU:
+                raise
+            logging.warning(f"GPU delegate unavailable ({e}). Falling back to CPU.")
+
 def run_face_mesh_detection():
     """
-    Initializes the webcam, performs real-time face mesh detection using MediaPipe,
-    and displays the annotated video feed.
+    Initializes the webcam, performs real-time face mesh detection using the
+    MediaPipe Tasks FaceLandmarker, and displays the annotated video feed.
     """
-    # --- MediaPipe Face Mesh Initialization ---
-    # Initialize the FaceMesh solution from MediaPipe
-    # 'static_image_mode=False' for video processing, 'max_num_faces=1' to detect one face
-    # 'min_detection_confidence' and 'min_tracking_confidence' ensure robust detection
-    mp_face_mesh = mp.solutions.face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(
-        static_image_mode=False,
-        max_num_faces=1,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
+    # --- MediaPipe Face Landmarker Initialization ---
+    if not os.path.exists(FACE_LANDMARKER_MODEL_PATH):
+        logging.error(f"Error: Face landmarker model not found at '{FACE_LANDMARKER_MODEL_PATH}'. "
+                      f"Download it from {FACE_LANDMARKER_MODEL_URL}")
+        return
 
     # --- OpenCV Video Capture Initialization ---
     # Create an object to capture video from the default webcam (0)
@@ -32,46 +75,99 @@ def run_face_mesh_detection():
         logging.error("Error: Could not open webcam. Please check if it's connected and not in use.")
         return # Exit if the webcam can't be accessed
 
+    # The landmarker runs asynchronously; the newest result is kept here and drawn
+    # on the frames that follow until a newer one arrives.
+    latest_result = None
+
+    def on_result(result, output_image, timestamp_ms):
+        nonlocal latest_result
+        latest_result = result
+
+    # Created only once the webcam is open, so no early return leaves it running
+    try:
+        face_landmarker = create_face_landmarker(on_result)
+    except Exception:
+        cap.release()
+        raise
+
+    configure_webcam(cap)
+
     logging.info("Webcam opened successfully. Displaying real-time face mesh. Press 'q' to quit.")
 
+    frame_queue, stop_event, capture_thread = start_capture_thread(cap, PROCESS_EVERY_N_FRAMES)
+
+    # Output buffer for the BGR to RGB conversion, reused across frames so no new
+    # image is allocated per frame. It is (re)allocated when the frame size changes.
+    rgb_buf = None
+
+    # Landmark coordinates of the current face, (re)allocated when the landmark count changes
+    landmark_buf = None
+
+    # Timestamps passed to the landmarker must increase monotonically
+    last_timestamp_ms = -1
+
     # --- Main Video Processing Loop ---
     while True:
-        # Read a frame from the webcam
-        # 'ret' (return value) is True if the frame was read successfully, 'frame' is the image itself
-        ret, frame = cap.read()
+        # Wait for the newest decoded frame from the capture thread
+        frame = frame_queue.get()
 
-        # If frame reading failed, break the loop
-        if not ret:
+        # If the webcam stopped delivering frames, break the loop
+        if frame is None:
             logging.warning("Failed to grab frame from webcam. Exiting application.")
             break
 
         # --- Pre-processing for MediaPipe ---
         # MediaPipe expects RGB images, but OpenCV reads in BGR format.
         # Convert the frame from BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if rgb_buf is None or rgb_buf.shape != frame.shape:
+            rgb_buf = np.empty_like(frame)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buf)
 
-        # To improve performance, optionally mark the frame as not writeable to
-        # pass by reference.
-        rgb_frame.flags.writeable = False
+        # --- Face Landmark Processing ---
+        # Queue the RGB frame for asynchronous landmark detection; the result arrives through on_result
+        timestamp_ms = max(int(time.monotonic() * 1000), last_timestamp_ms + 1)
+        last_timestamp_ms = timestamp_ms
+        face_landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame), timestamp_ms)
 
-        # --- Face Mesh Processing ---
-        # Process the RGB frame to detect face landmarks
-        results = face_mesh.process(rgb_frame)
+        # --- Drawing Landmarks on the Frame ---
+        # Check if any face landmarks were detected so far
+        result = latest_result
+        if result is not None and result.face_landmarks:
+            # Frame width (shape[1]) and height (shape[0]) used to scale normalized coordinates,
+            # and the largest valid pixel coordinates
+            frame_size = np.array([frame.shape[1], frame.shape[0]], dtype=np.float32)
+            max_xy = np.array([frame.shape[1] - 1, frame.shape[0] - 1], dtype=np.int32)
 
-        # Mark the frame as writeable again
-        rgb_frame.flags.writeable = True
+            # Iterate through each detected face (though we set num_faces=1)
+            for face_landmarks in result.face_landmarks:
+                # Collect the normalized coordinates (0 to 1) of all landmarks into one array
+                if landmark_buf is None or len(landmark_buf) != len(face_landmarks):
+                    landmark_buf = np.empty((len(face_landmarks), 3), dtype=np.float32)
+                pts = landmarks_to_array(face_landmarks, landmark_buf)
 
-        # --- Drawing Landmarks on the Frame ---
-        # Check if any face landmarks were detected
-        if results.multi_face_landmarks:
-            # Iterate through each detected face (though we set max_num_faces=1)
-            for face_landmarks in results.multi_face_landmarks:
-                # Iterate through each landmark point in the face mesh
-                for landmark_point in face_landmarks.landmark:
-                    # Convert normalized landmark coordinates (0 to 1) to pixel coordinates
-                    # Multiply by frame width (shape[1]) and height (shape[0])
-                    x = int(landmark_point.x * frame.shape[1])
-                    y = int(landmark_point.y * frame.shape[0])
-
-                    # Draw a small circle at each landmark point on the original BGR frame
-                    # (
\ No newline at end of file
+                # Convert all (x, y) pairs to pixel coordinates in one pass, clipped in place
+                # to the frame since landmarks can fall slightly outside it
+                xy = (pts[:, :2] * frame_size).astype(np.int32)
+                np.clip(xy, 0, max_xy, out=xy)
+
+                # Color every landmark pixel green on the original BGR frame in a single assignment
+                frame[xy[:, 1], xy[:, 0]] = (0, 255, 0)
+
+        # Display the annotated frame
+        cv2.imshow("Real-time Face Mesh", frame)
+
+        # Break the loop if 'q' is pressed
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            logging.info("'q' pressed. Exiting application.")
+            break
+
+    # --- Release Resources ---
+    stop_capture_thread(stop_event, capture_thread)
+    face_landmarker.close()
+    # Release the webcam and destroy all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    logging.info("Webcam released and windows closed. Application terminated.")
+
+if __name__ == "__main__":
+    run_face_mesh_detection()
\ No newline at end of file
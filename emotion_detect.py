@@ -1,15 +1,447 @@
+import os
+from collections import deque
 import cv2
-from deepface import DeepFace
+import mediapipe as mp
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnxruntime.transformers import float16
+from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, create_calibrator,
+                                      quantize_static, write_calibration_table)
 import logging
 
+from camera_utils import configure_webcam, start_capture_thread, stop_capture_thread
+
 # Configure logging for better error tracking
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Emotion Model Settings ---
+# FP32 ONNX export of DeepFace's emotion CNN, its statically quantized INT8 (QDQ)
+# version for CPU inference and its FP16 version for GPU inference.
+EMOTION_ONNX_PATH = "emotion.onnx"
+EMOTION_QDQ_ONNX_PATH = "emotion.qdq.int8.onnx"
+EMOTION_FP16_ONNX_PATH = "emotion.fp16.onnx"
+# GPU execution providers that run the FP16 model, in order of preference.
+GPU_EXECUTION_PROVIDERS = ["CUDAExecutionProvider", "DmlExecutionProvider"]
+# Directory where the TensorRT execution provider caches its built engines. ONNX Runtime
+# looks up the INT8 calibration table by name inside this directory, so it is written there too.
+TENSORRT_CACHE_DIR = "trt_cache"
+TENSORRT_CALIBRATION_TABLE_NAME = "calibration.flatbuffers"
+TENSORRT_CALIBRATION_TABLE_PATH = os.path.join(TENSORRT_CACHE_DIR, TENSORRT_CALIBRATION_TABLE_NAME)
+# Temporary model the calibrator augments to collect activation ranges.
+CALIBRATION_AUGMENTED_ONNX_PATH = "emotion.augmented.onnx"
+# Name given to the model input when exporting to ONNX.
+EMOTION_INPUT_NAME = "input"
+# The emotion CNN expects 48x48 grayscale face crops scaled to [0, 1].
+EMOTION_INPUT_SIZE = 48
+# Output classes of DeepFace's emotion model, in the order of its softmax vector.
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# --- Calibration Settings ---
+# Preprocessed webcam face crops used to calibrate activation ranges for static quantization.
+CALIBRATION_DATA_PATH = "emotion_calibration.npy"
+CALIBRATION_SAMPLES = 200
+# Give up collecting calibration crops after this many frames.
+MAX_CALIBRATION_FRAMES = 2000
+
+# --- Capture Settings ---
+# The emotion pipeline runs at roughly 10 FPS, so only every 3rd camera frame is decoded and analyzed.
+PROCESS_EVERY_N_FRAMES = 3
+# Number of analyzed frames whose faces are classified together in one inference call.
+# The display runs EMOTION_BATCH_SIZE analyzed frames behind the camera.
+EMOTION_BATCH_SIZE = 4
+
+# --- Display Settings ---
+# Baseline-left position of the status text on each frame.
+LABEL_ORIGIN = (50, 50)
+
+# --- Face Detection Settings ---
+# Width in pixels of the downscaled frame searched for faces (height keeps the aspect ratio).
+# The detected box is relative, so it still maps onto the full-resolution frame.
+DETECTION_WIDTH = 320
+
+def export_emotion_model(onnx_path: str) -> None:
+    """
+    Builds DeepFace's emotion CNN and exports it to ONNX.
+
+    DeepFace and TensorFlow are only needed for this one-off export, so they
+    are imported here rather than on every start-up.
+
+    Args:
+        onnx_path (str): Where to write the FP32 ONNX model.
+    """
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    try:
+        emotion_model = DeepFace.build_model("Emotion", task="facial_attribute")
+    except TypeError:
+        # Older DeepFace versions have no 'task' argument.
+        emotion_model = DeepFace.build_model("Emotion")
+    # Newer DeepFace versions wrap the Keras model in a client object.
+    keras_model = getattr(emotion_model, "model", emotion_model)
+    # Leave the batch dimension dynamic so several crops can share one call.
+    input_signature = (tf.TensorSpec((None, EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE, 1), tf.float32, name=EMOTION_INPUT_NAME),)
+    tf2onnx.convert.from_keras(keras_model, input_signature=input_signature, output_path=onnx_path)
+    logging.info(f"Exported emotion model to {onnx_path}.")
+
+class FaceCalibrationDataReader(CalibrationDataReader):
+    """
+    Feeds preprocessed face crops to ONNX Runtime's static quantization
+    calibrator, one (1, 48, 48, 1) sample at a time.
+    """
+    def __init__(self, face_inputs: np.ndarray):
+        self._samples = iter(face_inputs)
+
+    def get_next(self):
+        face_input = next(self._samples, None)
+        if face_input is None:
+            return None
+        return {EMOTION_INPUT_NAME: face_input}
+
+def quantize_emotion_model(onnx_path: str, qdq_path: str, calibration_faces: np.ndarray) -> None:
+    """
+    Applies INT8 static quantization (QDQ format, per-channel weights) to the
+    exported emotion model, calibrating activation ranges on real face crops.
+
+    Args:
+        onnx_path (str): Path to the FP32 ONNX model.
+        qdq_path (str): Where to write the INT8 QDQ model.
+        calibration_faces (np.ndarray): Preprocessed face crops of shape (N, 1, 48, 48, 1).
+    """
+    quantize_static(
+        model_input=onnx_path,
+        model_output=qdq_path,
+        calibration_data_reader=FaceCalibrationDataReader(calibration_faces),
+        quant_format=QuantFormat.QDQ,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+    logging.info(f"Quantized emotion model to {qdq_path} using {len(calibration_faces)} calibration faces.")
+
+def convert_emotion_model_to_fp16(onnx_path: str, fp16_path: str) -> None:
+    """
+    Converts the exported emotion model to FP16 for GPU inference. Inputs and
+    outputs stay float32, so preprocessing is the same as for the CPU model.
+
+    Args:
+        onnx_path (str): Path to the FP32 ONNX model.
+        fp16_path (str): Where to write the FP16 model.
+    """
+    model_fp16 = float16.convert_float_to_float16(onnx.load(onnx_path), keep_io_types=True)
+    onnx.save(model_fp16, fp16_path)
+    logging.info(f"Converted emotion model to FP16 at {fp16_path}.")
+
+def write_tensorrt_calibration_table(onnx_path: str, calibration_faces: np.ndarray) -> None:
+    """
+    Collects activation ranges of the FP32 emotion model on real face crops and
+    writes them as the INT8 calibration table used by the TensorRT execution provider.
+
+    Args:
+        onnx_path (str): Path to the FP32 ONNX model.
+        calibration_faces (np.ndarray): Preprocessed face crops of shape (N, 1, 48, 48, 1).
+    """
+    calibrator = create_calibrator(onnx_path, augmented_model_path=CALIBRATION_AUGMENTED_ONNX_PATH,
+                                   calibrate_method=CalibrationMethod.MinMax)
+    calibrator.collect_data(FaceCalibrationDataReader(calibration_faces))
+    # Writes calibration.flatbuffers (plus .cache/.json copies) into the TensorRT cache directory.
+    os.makedirs(TENSORRT_CACHE_DIR, exist_ok=True)
+    write_calibration_table(calibrator.compute_data(), dir=TENSORRT_CACHE_DIR)
+    logging.info(f"Wrote TensorRT calibration table to {TENSORRT_CALIBRATION_TABLE_PATH}.")
+
+def create_emotion_session(model_path: str, providers: list) -> ort.InferenceSession:
+    """
+    Creates an ONNX Runtime session for the emotion model with full graph
+    optimizations and one intra-op thread per CPU core.
+
+    Args:
+        model_path (str): Path to the ONNX model to load.
+        providers (list): Execution providers to use, in order of preference.
+
+    Returns:
+        ort.InferenceSession: The ready-to-run inference session.
+    """
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = os.cpu_count() or 1
+    return ort.InferenceSession(model_path, sess_options, providers=providers)
+
+def try_create_emotion_session(model_path: str, providers: list):
+    """
+    Creates an emotion model session and checks that the first-choice execution
+    provider really attached to it. ONNX Runtime silently falls back to the CPU
+    when a provider is built in but its device is unusable.
+
+    Args:
+        model_path (str): Path to the ONNX model to load.
+        providers (list): Execution providers to use, the intended one first.
+
+    Returns:
+        ort.InferenceSession or None: The session, or None if the intended provider
+                                      could not be used and the next tier should be tried.
+    """
+    intended_provider = providers[0] if isinstance(providers[0], str) else providers[0][0]
+    try:
+        emotion_session = create_emotion_session(model_path, providers)
+    except Exception as e:
+        logging.warning(f"Could not create emotion session on {intended_provider}: {e}")
+        return None
+    if emotion_session.get_providers()[0] != intended_provider:
+        logging.warning(f"{intended_provider} did not attach to the emotion session. Trying the next option.")
+        return None
+    return emotion_session
+
+def preprocess_face(gray_face: np.ndarray) -> np.ndarray:
+    """
+    Prepares a grayscale face crop the same way DeepFace does for its
+    emotion model.
+
+    Args:
+        gray_face (np.ndarray): Grayscale face crop of any size.
+
+    Returns:
+        np.ndarray: A (1, 48, 48, 1) float32 array scaled to [0, 1].
+    """
+    face = cv2.resize(gray_face, (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE))
+    return face.astype(np.float32).reshape(1, EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE, 1) / 255.0
+
+def classify_emotions(emotion_session: ort.InferenceSession, face_inputs: list) -> list:
+    """
+    Classifies a batch of preprocessed face crops with a single inference call.
+
+    Args:
+        emotion_session (ort.InferenceSession): The emotion model session.
+        face_inputs (list): Face crops of shape (1, 48, 48, 1), as returned by preprocess_face.
+
+    Returns:
+        list: The dominant emotion label for each face, in input order.
+    """
+    if not face_inputs:
+        return []
+    scores = emotion_session.run(None, {EMOTION_INPUT_NAME: np.concatenate(face_inputs)})[0]
+    return [EMOTION_LABELS[i] for i in np.argmax(scores, axis=1)]
+
+def detect_face(face_detector, frame: np.ndarray):
+    """
+    Detects the most confident face in a frame with MediaPipe Face Detection.
+
+    Args:
+        face_detector: The MediaPipe FaceDetection instance.
+        frame (np.ndarray): BGR frame to search.
+
+    Returns:
+        tuple or None: The (x, y, w, h) pixel box of the face, clipped to the frame,
+                       or None if no face was found.
+    """
+    # Downscale first, then convert the small frame to RGB for MediaPipe, so the color
+    # conversion only touches a fraction of the pixels.
+    frame_height, frame_width = frame.shape[:2]
+    detection_height = int(frame_height * (DETECTION_WIDTH / frame_width))
+    small_frame = cv2.resize(frame, (DETECTION_WIDTH, detection_height))
+    rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+    rgb_frame.flags.writeable = False
+    results = face_detector.process(rgb_frame)
+    if not results.detections:
+        return None
+
+    # Convert the relative bounding box to pixel coordinates inside the frame.
+    bbox = results.detections[0].location_data.relative_bounding_box
+    x_min = max(int(bbox.xmin * frame_width), 0)
+    y_min = max(int(bbox.ymin * frame_height), 0)
+    x_max = min(int((bbox.xmin + bbox.width) * frame_width), frame_width)
+    y_max = min(int((bbox.ymin + bbox.height) * frame_height), frame_height)
+    if x_max <= x_min or y_max <= y_min:
+        return None
+    return x_min, y_min, x_max - x_min, y_max - y_min
+
+def extract_face_input(frame: np.ndarray, face_box: tuple) -> np.ndarray:
+    """
+    Crops a detected face from a BGR frame and preprocesses it for the emotion model.
+
+    Args:
+        frame (np.ndarray): BGR frame containing the face.
+        face_box (tuple): The (x, y, w, h) pixel box of the face.
+
+    Returns:
+        np.ndarray: A (1, 48, 48, 1) float32 array, as returned by preprocess_face.
+    """
+    x, y, w, h = face_box
+    # Only the face crop is converted to grayscale, not the whole frame.
+    return preprocess_face(cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY))
+
+def load_calibration_faces(cap: cv2.VideoCapture, face_detector) -> np.ndarray:
+    """
+    Loads saved calibration face crops, or captures them from the webcam and
+    saves them for later runs.
+
+    Args:
+        cap (cv2.VideoCapture): The opened webcam.
+        face_detector: The MediaPipe FaceDetection instance.
+
+    Returns:
+        np.ndarray: Preprocessed face crops of shape (N, 1, 48, 48, 1).
+    """
+    if os.path.exists(CALIBRATION_DATA_PATH):
+        return np.load(CALIBRATION_DATA_PATH)
+
+    logging.info(f"Collecting {CALIBRATION_SAMPLES} face crops for calibration. Please look at the camera.")
+    calibration_faces = []
+    for _ in range(MAX_CALIBRATION_FRAMES):
+        if len(calibration_faces) >= CALIBRATION_SAMPLES:
+            break
+        ret, frame = cap.read()
+        if not ret:
+            break
+        face_box = detect_face(face_detector, frame)
+        if face_box is not None:
+            calibration_faces.append(extract_face_input(frame, face_box))
+
+    if not calibration_faces:
+        raise RuntimeError("No faces found while collecting calibration data.")
+
+    calibration_faces = np.stack(calibration_faces)
+    np.save(CALIBRATION_DATA_PATH, calibration_faces)
+    logging.info(f"Saved {len(calibration_faces)} calibration faces to {CALIBRATION_DATA_PATH}.")
+    return calibration_faces
+
+def load_emotion_session(cap: cv2.VideoCapture, face_detector) -> ort.InferenceSession:
+    """
+    Loads the emotion model on the fastest execution provider that works, in this order:
+    TensorRT (INT8 from a calibration table), CUDA/DirectML (FP16 model),
+    OpenVINO (INT8 QDQ model), then plain CPU (INT8 QDQ model). A tier whose
+    provider does not attach falls through to the next one. Models and
+    calibration data missing from earlier runs are prepared first.
+
+    Args:
+        cap (cv2.VideoCapture): The opened webcam, used if calibration faces are needed.
+        face_detector: The MediaPipe FaceDetection instance.
+
+    Returns:
+        ort.InferenceSession: The ready-to-run inference session.
+
+    Raises:
+        RuntimeError: If calibration faces are needed but none could be captured.
+    """
+    available_providers = ort.get_available_providers()
+
+    if "TensorrtExecutionProvider" in available_providers:
+        # TensorRT builds its own INT8 engine from the FP32 model and the calibration table.
+        if not os.path.exists(TENSORRT_CALIBRATION_TABLE_PATH):
+            write_tensorrt_calibration_table(EMOTION_ONNX_PATH, load_calibration_faces(cap, face_detector))
+        trt_options = {
+            "trt_int8_enable": True,
+            "trt_int8_calibration_table_name": TENSORRT_CALIBRATION_TABLE_NAME,
+            # Reuse the built INT8 engine across runs instead of rebuilding it on every start.
+            "trt_engine_cache_enable": True,
+            "trt_engine_cache_path": TENSORRT_CACHE_DIR
+        }
+        # Without a usable TensorRT device this would run the unquantized model on the CPU,
+        # so the session is only kept if TensorRT really attached.
+        emotion_session = try_create_emotion_session(
+            EMOTION_ONNX_PATH,
+            [("TensorrtExecutionProvider", trt_options), "CUDAExecutionProvider", "CPUExecutionProvider"]
+        )
+        if emotion_session is not None:
+            logging.info("Running INT8 emotion model on TensorrtExecutionProvider.")
+            return emotion_session
+
+    gpu_provider = next((provider for provider in GPU_EXECUTION_PROVIDERS if provider in available_providers), None)
+    if gpu_provider is not None:
+        # Run the FP16 model on the GPU, falling back to the CPU for unsupported nodes.
+        # The FP16 model is only kept if the GPU provider really attached.
+        if not os.path.exists(EMOTION_FP16_ONNX_PATH):
+            convert_emotion_model_to_fp16(EMOTION_ONNX_PATH, EMOTION_FP16_ONNX_PATH)
+        emotion_session = try_create_emotion_session(EMOTION_FP16_ONNX_PATH, [gpu_provider, "CPUExecutionProvider"])
+        if emotion_session is not None:
+            logging.info(f"Running FP16 emotion model on {gpu_provider}.")
+            return emotion_session
+
+    # Statically quantize the emotion model on face crops from this webcam,
+    # unless a quantized model from an earlier run is available.
+    if not os.path.exists(EMOTION_QDQ_ONNX_PATH):
+        quantize_emotion_model(EMOTION_ONNX_PATH, EMOTION_QDQ_ONNX_PATH, load_calibration_faces(cap, face_detector))
+
+    if "OpenVINOExecutionProvider" in available_providers:
+        # OpenVINO runs the QDQ graph as fused INT8 kernels on the CPU.
+        emotion_session = try_create_emotion_session(
+            EMOTION_QDQ_ONNX_PATH,
+            [("OpenVINOExecutionProvider", {"device_type": "CPU"}), "CPUExecutionProvider"]
+        )
+        if emotion_session is not None:
+            logging.info("Running INT8 QDQ emotion model on OpenVINOExecutionProvider.")
+            return emotion_session
+
+    logging.info("Running INT8 QDQ emotion model on CPUExecutionProvider.")
+    return create_emotion_session(EMOTION_QDQ_ONNX_PATH, ["CPUExecutionProvider"])
+
+def render_label(text: str, color: tuple) -> tuple:
+    """
+    Rasterizes a text label once and precomputes its blending terms, so it can
+    be blended onto frames instead of being drawn with cv2.putText every frame.
+
+    Args:
+        text (str): The label text.
+        color (tuple): BGR text color.
+
+    Returns:
+        tuple: (inverse_alpha, premultiplied, offset) where inverse_alpha is the float32
+               (1 - alpha) of the anti-aliased text coverage, premultiplied is the float32
+               color * alpha (plus 0.5 for rounding) and offset is the (x, y) position of
+               the text baseline origin inside the label.
+    """
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = 1
+    thickness = 2
+    (text_width, text_height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+    # Pad by the stroke thickness so thick strokes are not clipped at the edges.
+    coverage = np.zeros((text_height + baseline + 2 * thickness, text_width + 2 * thickness), dtype=np.uint8)
+    offset = (thickness, thickness + text_height)
+    # Partially covered edge pixels get partial alpha.
+    cv2.putText(coverage, text, offset, font, font_scale, 255, thickness, cv2.LINE_AA)
+    alpha = (coverage.astype(np.float32) / 255.0)[:, :, np.newaxis]
+    inverse_alpha = 1.0 - alpha
+    premultiplied = np.asarray(color, dtype=np.float32) * alpha + 0.5
+    return inverse_alpha, premultiplied, offset
+
+def draw_label(frame: np.ndarray, label: tuple) -> None:
+    """
+    Alpha-blends a pre-rendered label onto a frame at LABEL_ORIGIN with a single
+    multiply-add over the small region the label covers.
+
+    Args:
+        frame (np.ndarray): BGR frame to draw on.
+        label (tuple): A label as returned by render_label.
+    """
+    inverse_alpha, premultiplied, (offset_x, offset_y) = label
+    x, y = LABEL_ORIGIN[0] - offset_x, LABEL_ORIGIN[1] - offset_y
+    roi = frame[y:y + inverse_alpha.shape[0], x:x + inverse_alpha.shape[1]]
+    height, width = roi.shape[:2]
+    roi[:] = roi * inverse_alpha[:height, :width] + premultiplied[:height, :width]
+
+# --- Label Rendering ---
+# Pre-render every status label once: green for each emotion, red for no face or errors.
+EMOTION_LABEL_IMAGES = {emotion: render_label(f'Emotion: {emotion}', (0, 255, 0)) for emotion in EMOTION_LABELS}
+NO_FACE_LABEL_IMAGE = render_label("No face detected", (0, 0, 255))
+ERROR_LABEL_IMAGE = render_label("Analysis error", (0, 0, 255))
+
+# --- Model Initialization ---
+# Export the emotion CNN to ONNX only if no earlier run has done so already;
+# it is quantized once calibration faces are available.
+if not os.path.exists(EMOTION_ONNX_PATH):
+    export_emotion_model(EMOTION_ONNX_PATH)
+
 def run_emotion_recognition():
     """
-    Initializes the webcam, performs real-time emotion detection using DeepFace,
-    and displays the results.
+    Initializes the webcam, performs real-time emotion detection with the
+    quantized emotion model, and displays the results.
     """
+    # Create MediaPipe's short-range (BlazeFace) face detector once, outside the frame loop.
+    # It replaces the heavier detectors DeepFace would otherwise run on every call.
+    face_detector = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+
     # Open the default webcam
     cap = cv2.VideoCapture(0)
 
@@ -18,60 +450,88 @@ def run_emotion_recognition():
         logging.error("Error: Could not open webcam.")
         return
 
+    configure_webcam(cap)
+
+    try:
+        emotion_session = load_emotion_session(cap, face_detector)
+    except RuntimeError as e:
+        logging.error(f"Error: Could not load emotion model: {e}")
+        cap.release()
+        return
+
     logging.info("Webcam opened successfully. Press 'q' to quit.")
 
+    # Frames wait here with their face crop until a full batch can be classified at once,
+    # then move to ready_frames with their label and are shown one per loop iteration.
+    pending_frames = deque()
+    ready_frames = deque()
+
+    frame_queue, stop_event, capture_thread = start_capture_thread(cap, PROCESS_EVERY_N_FRAMES)
+
     while True:
-        ret, frame = cap.read()
+        # Wait for the newest decoded frame from the capture thread
+        frame = frame_queue.get()
 
-        if not ret:
+        if frame is None:
             logging.warning("Failed to grab frame, exiting...")
             break
 
+        # Detect the face now; the emotion model runs once per batch below.
+        face_input = None
+        status_label = None
         try:
-            # Analyze emotions in the current frame
-            # enforce_detection=False allows analysis even if no face is perfectly detected,
-            # which can be useful for robustness but might yield less accurate results
-            # if no face is present or clearly visible.
-            results = DeepFace.analyze(frame, actions=["emotion"], enforce_detection=False)
-
-            if results:
-                # Get the dominant emotion from the first detected face
-                dominant_emotion = results[0]['dominant_emotion']
-                # Define text properties for display
-                text = f'Emotion: {dominant_emotion}'
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 1
-                color = (0, 255, 0)  # Green color for the text
-                thickness = 2
-                org = (50, 50) # Position of the text
-
-                # Put the emotion text on the frame
-                cv2.putText(frame, text, org, font, font_scale, color, thickness)
+            # Detect the face and crop it for the emotion model
+            face_box = detect_face(face_detector, frame)
+
+            if face_box is not None:
+                face_input = extract_face_input(frame, face_box)
             else:
-                # If no face is detected or DeepFace doesn't return results
+                # If no face is detected in the frame
                 logging.info("No face detected or emotion analysis results found.")
-                text = "No face detected"
-                cv2.putText(frame, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2) # Red for no face
-
+                status_label = NO_FACE_LABEL_IMAGE
         except Exception as e:
-            logging.error(f"Error during DeepFace analysis: {e}")
-            text = "Analysis error"
-            cv2.putText(frame, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            logging.error(f"Error during face detection: {e}")
+            status_label = ERROR_LABEL_IMAGE
+
+        pending_frames.append((frame, face_input, status_label))
+
+        if len(pending_frames) == EMOTION_BATCH_SIZE:
+            # Classify every buffered face with a single call to the emotion model
+            face_inputs = [face_input for _, face_input, _ in pending_frames if face_input is not None]
+            try:
+                emotions = iter(classify_emotions(emotion_session, face_inputs))
+            except Exception as e:
+                logging.error(f"Error during emotion inference: {e}")
+                emotions = None
+
+            # Label the buffered frames and queue them for display in capture order
+            while pending_frames:
+                frame, face_input, status_label = pending_frames.popleft()
+                if status_label is None:
+                    # The emotion label, or the error label if inference failed
+                    status_label = EMOTION_LABEL_IMAGES[next(emotions)] if emotions is not None else ERROR_LABEL_IMAGE
+                ready_frames.append((frame, status_label))
 
+        # Show one labelled frame per incoming frame, so the display keeps a steady pace
+        # EMOTION_BATCH_SIZE analyzed frames behind the camera.
+        if ready_frames:
+            frame, status_label = ready_frames.popleft()
+            draw_label(frame, status_label)
 
-        # Resize the frame for consistent display
-        display_width = 800
-        display_height = int(frame.shape[0] * (display_width / frame.shape[1])) # Maintain aspect ratio
-        resized_frame = cv2.resize(frame, (display_width, display_height))
+            # Resize the frame for consistent display
+            display_width = 800
+            display_height = int(frame.shape[0] * (display_width / frame.shape[1])) # Maintain aspect ratio
+            resized_frame = cv2.resize(frame, (display_width, display_height))
 
-        # Display the frame with emotion
-        cv2.imshow("Real-time Emotion Recognition", resized_frame)
+            # Display the frame with emotion
+            cv2.imshow("Real-time Emotion Recognition", resized_frame)
 
         # Break the loop if 'q' is pressed
         if cv2.waitKey(1) & 0xFF == ord('q'):
             logging.info("'q' pressed, exiting application.")
             break
 
+    stop_capture_thread(stop_event, capture_thread)
     # Release the webcam and destroy all OpenCV windows
     cap.release()
     cv2.destroyAllWindows()
@@ -1,9 +1,16 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+import numba
+import queue
+import threading
+import time
 import winsound
 import logging
 
+from camera_utils import configure_webcam, start_capture_thread, stop_capture_thread
+from landmark_utils import landmarks_to_array
+
 # --- Setup Logging ---
 # Configure logging for informative messages, warnings, and errors.
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,6 +22,19 @@ KNOWN_PALM_WIDTH_CM = 8.0
 # This is crucial for accurate distance measurement and should be determined
 # experimentally for your specific camera.
 FOCAL_LENGTH_PIXELS = 500
+# Known_Width * Focal_Length, precomputed once for the distance formula.
+_KW_FL = KNOWN_PALM_WIDTH_CM * FOCAL_LENGTH_PIXELS
+
+# --- Capture Settings ---
+# Hand tracking runs slower than the camera, so only every 2nd frame is decoded and processed.
+PROCESS_EVERY_N_FRAMES = 2
+# Width in pixels of the downscaled frame passed to MediaPipe Hands (height keeps the aspect ratio).
+# Landmarks come back normalized, so they still map onto the full-resolution frame.
+PROCESSING_WIDTH = 320
+
+# --- Proximity Alert Settings ---
+# Minimum time between two alert beeps, so a hand held close does not queue up beeps.
+ALERT_MIN_INTERVAL_S = 1.0
 
 # --- Mediapipe Initialization ---
 # Initialize MediaPipe Hands solution.
@@ -28,26 +48,47 @@ hands = mp_hands.Hands(
 # Initialize MediaPipe drawing utilities for rendering landmarks and connections.
 mp_drawing = mp.solutions.drawing_utils
 
-# --- Function to Calculate Distance ---
-def calculate_distance(perceived_width_pixels: int) -> float:
+# --- JIT-compiled Per-hand Math ---
+@numba.njit(cache=True, fastmath=True)
+def compute_bbox_dist(pts, W, H):
     """
-    Calculates the distance of an object from the camera based on its
-    perceived width in pixels, a known real-world width, and the camera's
-    focal length.
+    Computes a hand's pixel bounding box and its distance from the camera in
+    one compiled pass over its normalized landmark coordinates.
 
     Args:
-        perceived_width_pixels (int): The width of the object as detected in pixels.
+        pts (np.ndarray): (21, 3) float32 array of normalized (x, y, z) landmark coordinates.
+        W (int): Frame width in pixels.
+        H (int): Frame height in pixels.
 
     Returns:
-        float: The estimated distance of the object from the camera in centimeters.
-              Returns 0 if perceived_width_pixels is zero to avoid division by zero.
+        tuple: (x_min, y_min, x_max, y_max, distance_cm). distance_cm is 0 when
+               the bounding box has zero width.
+    """
+    xs = pts[:, 0] * W
+    ys = pts[:, 1] * H
+    x_min, y_min = int(np.min(xs)), int(np.min(ys))
+    x_max, y_max = int(np.max(xs)), int(np.max(ys))
+    perceived_width = x_max - x_min
+    distance_cm = 0.0
+    if perceived_width != 0:
+        # Formula: Distance = (Known_Width * Focal_Length) / Perceived_Width
+        # _KW_FL is a module-level constant, so Numba folds it into the compiled kernel.
+        distance_cm = _KW_FL / perceived_width
+    return x_min, y_min, x_max, y_max, distance_cm
+
+def play_alerts(alert_queue: queue.Queue) -> None:
     """
-    if perceived_width_pixels == 0:
-        logging.warning("Perceived width is zero, cannot calculate distance. Returning 0.")
-        return 0.0
-    # Formula: Distance = (Known_Width * Focal_Length) / Perceived_Width
-    distance_cm = (KNOWN_PALM_WIDTH_CM * FOCAL_LENGTH_PIXELS) / perceived_width_pixels
-    return distance_cm
+    Runs in a background thread and plays a beep for every alert put on
+    alert_queue, so the blocking winsound.Beep call stays out of the frame loop.
+
+    Args:
+        alert_queue (queue.Queue): Queue of pending alerts. A None entry stops the thread.
+    """
+    for _ in iter(alert_queue.get, None):
+        try:
+            winsound.Beep(1000, 100) # Frequency (Hz), Duration (ms)
+        except Exception as e:
+            logging.error(f"Could not play sound: {e}. Ensure you are on Windows.")
 
 # --- Main Application Logic ---
 def run_hand_distance_measurement():
@@ -64,53 +105,69 @@ def run_hand_distance_measurement():
         logging.error("Error: Could not open webcam. Please ensure it is connected and not in use.")
         return # Exit if the webcam is not available
 
+    configure_webcam(cap)
+
     logging.info("Webcam opened successfully. Hand distance measurement started. Press 'q' to quit.")
 
+    frame_queue, stop_event, capture_thread = start_capture_thread(cap, PROCESS_EVERY_N_FRAMES)
+
+    # Output buffers for downscaling, color conversion and display resizing, reused across frames
+    # so no new images are allocated per frame. They are (re)allocated when the frame size changes.
+    small_bgr_buf = None
+    small_rgb_buf = None
+    display_buf = None
+
+    # Proximity alerts are played by a background thread so beeping never stalls the loop.
+    alert_queue = queue.Queue(maxsize=1)
+    alert_thread = threading.Thread(target=play_alerts, args=(alert_queue,), daemon=True)
+    alert_thread.start()
+    last_alert_time = 0.0
+
+    # Landmark coordinates of the current hand, refilled for every hand.
+    landmark_buf = np.empty((21, 3), dtype=np.float32)
+
     while True:
-        # Read a frame from the webcam.
-        # 'ret' is a boolean indicating success, 'frame' is the captured image.
-        ret, frame = cap.read()
+        # Wait for the newest decoded frame from the capture thread.
+        frame = frame_queue.get()
 
-        # If the frame could not be read, break the loop.
-        if not ret:
+        # If the webcam stopped delivering frames, break the loop.
+        if frame is None:
             logging.warning("Failed to grab frame from webcam. Exiting application.")
             break
 
-        # Convert the BGR (OpenCV default) frame to RGB (MediaPipe required format).
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Downscale the frame before hand detection to cut the data MediaPipe has to copy.
+        processing_height = int(frame.shape[0] * (PROCESSING_WIDTH / frame.shape[1]))
+        if small_bgr_buf is None or small_bgr_buf.shape[:2] != (processing_height, PROCESSING_WIDTH):
+            small_bgr_buf = np.empty((processing_height, PROCESSING_WIDTH, 3), dtype=np.uint8)
+            small_rgb_buf = np.empty_like(small_bgr_buf)
+        small_bgr = cv2.resize(frame, (PROCESSING_WIDTH, processing_height), dst=small_bgr_buf)
+
+        # Convert the downscaled BGR (OpenCV default) frame to RGB (MediaPipe required format),
+        # so the conversion only touches the small frame.
+        small_rgb = cv2.cvtColor(small_bgr, cv2.COLOR_BGR2RGB, dst=small_rgb_buf)
 
         # To improve performance, optionally mark the frame as not writeable to
         # pass by reference.
-        frame_rgb.flags.writeable = False
+        small_rgb.flags.writeable = False
         
-        # Process the RGB frame to detect hand landmarks.
-        results = hands.process(frame_rgb)
+        # Process the downscaled RGB frame to detect hand landmarks.
+        results = hands.process(small_rgb)
 
         # Re-enable writability of the frame.
-        frame_rgb.flags.writeable = True
+        small_rgb.flags.writeable = True
 
         # Check if any hands were detected.
         if results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
-                # Initialize min/max coordinates for bounding box calculation.
-                x_coords = []
-                y_coords = []
-
-                # Extract x and y coordinates for each landmark and store them.
-                for lm in hand_landmarks.landmark:
-                    # Convert normalized coordinates (0.0 to 1.0) to pixel coordinates.
-                    x_coords.append(int(lm.x * frame.shape[1]))
-                    y_coords.append(int(lm.y * frame.shape[0]))
-
-                # Calculate the bounding box coordinates.
-                x_min, y_min = min(x_coords), min(y_coords)
-                x_max, y_max = max(x_coords), max(y_coords)
-
-                # Calculate the perceived width of the hand in pixels.
-                perceived_width = x_max - x_min
+                # Extract the normalized (x, y, z) coordinates of all 21 landmarks into one array.
+                # Being normalized, they apply to the full-resolution frame as well.
+                pts = landmarks_to_array(hand_landmarks.landmark, landmark_buf)
 
-                # Calculate the estimated distance to the hand.
-                distance = calculate_distance(perceived_width)
+                # Calculate the pixel bounding box and the estimated distance to the hand.
+                x_min, y_min, x_max, y_max, distance = compute_bbox_dist(
+                    pts, frame.shape[1], frame.shape[0])
+                if x_max == x_min:
+                    logging.warning("Perceived width is zero, cannot calculate distance. Showing 0 cm.")
 
                 # Draw the bounding box around the detected hand.
                 cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 0), 2) # Green rectangle
@@ -128,10 +185,14 @@ def run_hand_distance_measurement():
                 PROXIMITY_THRESHOLD_CM = 20
                 if distance < PROXIMITY_THRESHOLD_CM and distance > 0: # Ensure valid distance
                     logging.info(f"Hand detected at {distance:.2f} cm. Proximity alert!")
-                    try:
-                        winsound.Beep(1000, 100) # Frequency (Hz), Duration (ms)
-                    except Exception as e:
-                        logging.error(f"Could not play sound: {e}. Ensure you are on Windows.")
+                    # Hand the beep to the alert thread, at most once per ALERT_MIN_INTERVAL_S.
+                    now = time.monotonic()
+                    if now - last_alert_time >= ALERT_MIN_INTERVAL_S:
+                        last_alert_time = now
+                        try:
+                            alert_queue.put_nowait(True)
+                        except queue.Full:
+                            pass # A beep is already pending
         else:
             # Optionally display a message if no hands are detected.
             no_hand_text = "No hand detected"
@@ -141,7 +202,9 @@ def run_hand_distance_measurement():
         # Calculate height to maintain aspect ratio, preventing distortion.
         display_width = 640
         display_height = int(frame.shape[0] * (display_width / frame.shape[1]))
-        resized_frame = cv2.resize(frame, (display_width, display_height))
+        if display_buf is None or display_buf.shape[:2] != (display_height, display_width):
+            display_buf = np.empty((display_height, display_width, 3), dtype=np.uint8)
+        resized_frame = cv2.resize(frame, (display_width, display_height), dst=display_buf)
 
         # Display the processed frame in a window.
         cv2.imshow('Hand Distance Measurement', resized_frame)
@@ -152,6 +215,10 @@ def run_hand_distance_measurement():
             break
 
     # --- Release Resources ---
+    stop_capture_thread(stop_event, capture_thread)
+    # Stop the alert thread; the blocking put waits for any pending beep to be taken first.
+    alert_queue.put(None)
+    alert_thread.join()
     # Release the webcam resource.
     cap.release()
     # Destroy all OpenCV windows.
@@ -0,0 +1,20 @@
+import numpy as np
+
+# Shared landmark helpers used by the face mesh and hand distance scripts.
+
+def landmarks_to_array(landmarks, out: np.ndarray) -> np.ndarray:
+    """
+    Copies the (x, y, z) coordinates of a landmark list into a preallocated
+    float32 array, reading each landmark's attributes exactly once and
+    converting them to the array in a single step, so all further math works
+    on array columns instead of landmark objects.
+
+    Args:
+        landmarks: Sequence of landmarks with x, y and z attributes.
+        out (np.ndarray): (N, 3) float32 array to fill, N being the number of landmarks.
+
+    Returns:
+        np.ndarray: The filled out array.
+    """
+    out[:] = [(lm.x, lm.y, lm.z) for lm in landmarks]
+    return out
\ No newline at end of file